@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import dataclasses
 import enum
+import functools
 import ntpath
 import os
 import posixpath
 import typing as t
 from pathlib import PurePosixPath, PureWindowsPath, Path
 
+import orjson
 from pydantic import BaseModel, Field
 from typing_extensions import Annotated, Literal
 
@@ -19,18 +22,25 @@ class ItemType(str, enum.Enum):
     Voice = "YukkuriMovieMaker.Project.Items.VoiceItem, YukkuriMovieMaker"
 
 
-class Animation(BaseModel):
+# Plain dataclasses rather than models: these value objects are created for
+# nearly every field of every item. pydantic still validates them as fields,
+# and orjson serializes them natively. Animation is frozen because const()
+# shares its instances.
+@dataclasses.dataclass(frozen=True)
+class Animation:
     From: float = 0.0
     To: float = 0.0
     AnimationType: str = "なし"
     Span: float = 0.0
 
     @classmethod
+    @functools.lru_cache(maxsize=128)
     def const(cls, value: float) -> Animation:
-        return cls(From=value)
+        return cls(From=float(value))
 
 
-class Decoration(BaseModel):
+@dataclasses.dataclass
+class Decoration:
     Start: int = 0
     Length: int = 4
     IsBold: bool = False
@@ -45,11 +55,11 @@ class Decoration(BaseModel):
 class AbstractItem(BaseModel):
     Type: ItemType = None
     Layer: int = 0
-    X: Animation = Field(default_factory=Animation)
-    Y: Animation = Field(default_factory=Animation)
+    X: Animation = Field(default_factory=lambda: Animation.const(0.0))
+    Y: Animation = Field(default_factory=lambda: Animation.const(0.0))
     Opacity: Animation = Field(default_factory=lambda: Animation.const(100.0))
     Zoom: Animation = Field(default_factory=lambda: Animation.const(100.0))
-    Rotation: Animation = Field(default_factory=Animation)
+    Rotation: Animation = Field(default_factory=lambda: Animation.const(0.0))
     Blend: str = "Normal"
     IsInverted: bool = False
     IsAlwaysOnTop: bool = False
@@ -85,8 +95,9 @@ class ItemBase(AbstractItem):
 
     @classmethod
     def from_spec(cls, *args) -> Item:
+        # attrs_from_spec only produces already-valid values.
         attrs = cls.attrs_from_spec(*args)
-        return cls(**attrs)
+        return cls.construct(**attrs)
 
 
 class ImageItem(ItemBase):
@@ -96,8 +107,7 @@ class ImageItem(ItemBase):
     @classmethod
     def attrs_from_spec(cls, project_root: Path, spec: "ImageSpec", *args) -> t.Dict[str, t.Any]:
         attrs = super().attrs_from_spec(spec, *args)
-        attrs["FilePath"] = PureWindowsPath(project_root / spec.image)
-        attrs["$type"] = ItemType.Image
+        attrs["FilePath"] = windows_path(project_root, spec.image)
         return attrs
 
 
@@ -118,7 +128,7 @@ class TextBase(BaseModel):
     Font: str = "メイリオ"
     FontSize: Animation = Field(default_factory=lambda: Animation.const(48))
     LineHeight2: Animation = Field(default_factory=lambda: Animation.const(100))
-    LetterSpacing2: Animation = Field(default_factory=Animation)
+    LetterSpacing2: Animation = Field(default_factory=lambda: Animation.const(0.0))
     DisplayInterval: float = 0.0
     BasePoint: str = "CenterCenter"
     FontColor: str = "#FF000000"
@@ -141,7 +151,6 @@ class TextItem(ItemBase, DecoratedText):
     def attrs_from_spec(cls, spec: "TextSpec", *args) -> t.Dict[str, t.Any]:
         attrs = super().attrs_from_spec(spec, *args)
         attrs["Text"] = spec.text
-        attrs["$type"] = ItemType.Text
         if spec.font_size:
             attrs["FontSize"] = Animation.const(spec.font_size)
         return attrs
@@ -221,11 +230,11 @@ class Character(AbstractItem, TextBase, VoiceBase):
     TachieType: str = "YukkuriMovieMaker.Plugin.Tachie.SimpleTachie.SimpleTachiePlugin"
     TachieCharacterParameter: t.Dict[str, t.Any] = Field(default_factory=dict)
     IsTachieLocked: bool = False
-    TachieX: Animation = Field(default_factory=Animation)
-    TachieY: Animation = Field(default_factory=Animation)
-    TachieOpacity: Animation = Field(default_factory=Animation.const(100.0))
-    TachieZoom: Animation = Field(default_factory=Animation.const(100.0))
-    TachieRotation: Animation = Field(default_factory=Animation.const(0))
+    TachieX: Animation = Field(default_factory=lambda: Animation.const(0.0))
+    TachieY: Animation = Field(default_factory=lambda: Animation.const(0.0))
+    TachieOpacity: Animation = Field(default_factory=lambda: Animation.const(100.0))
+    TachieZoom: Animation = Field(default_factory=lambda: Animation.const(100.0))
+    TachieRotation: Animation = Field(default_factory=lambda: Animation.const(0))
     TachieFadeIn: float = 0.0
     TachieFadeOut: float = 0.0
     TachieBlend: str = "Normal"
@@ -244,6 +253,27 @@ class Project(BaseModel):
     Timeline: Timeline
     Characters: t.List[Character]
 
+    class Config:
+        json_loads = orjson.loads
+
+
+class TimelineRaw(Timeline):
+    """Timeline whose items are kept as the dicts read from the save file."""
+
+    Items: t.List[t.Dict[str, t.Any]]
+
+
+class ProjectRaw(Project):
+    """Project that leaves timeline items unvalidated; see TimelineRaw."""
+
+    Timeline: TimelineRaw
+
+
+@functools.lru_cache(maxsize=None)
+def windows_path(root: Path, relative: str) -> str:
+    """Return the Windows-style path string of relative joined to root."""
+    return str(PureWindowsPath(root / relative))
+
 
 # From https://stackoverflow.com/a/72064941
 def dot_path(pth):
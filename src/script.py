@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import typing as t
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# (character name, stripped message) of a voice line. Both are the scalars'
+# source text rather than resolved YAML values: the message ends up in YMM
+# as text, so `霊夢: yes` says "yes", not True.
+VoiceLine = t.Tuple[str, str]
+ScriptLine = t.Union[VoiceLine, t.Dict[str, t.Any]]
+
+NULL_TAG = "tag:yaml.org,2002:null"
+
+# Keys that make a mapping an item spec rather than a voice line.
+ITEM_KEYS = ("image", "text")
+
+
+def iter_script(stream: t.BinaryIO) -> t.Iterator[ScriptLine]:
+    """Yield the voice lines and item specs of a script, in order.
+
+    A script is a YAML sequence. One-pair mappings are voice lines and are
+    yielded as VoiceLine; mappings with an image or text key are item specs
+    and are yielded as dicts with values resolved as yaml.safe_load would.
+    Anything else (plain strings, lists, empty mappings) is skipped. As with
+    safe_load, the last of duplicate keys wins and aliases resolve to their
+    anchored scalar or line. Voice lines whose name or message is null
+    (`霊夢:` or `霊夢: ~`) are rejected.
+
+    Works on the parser's event stream, so only the current line and
+    anchored nodes are held in memory. Raises ValueError for YAML that this
+    shape cannot hold, such as nested collections inside a line.
+    """
+    loader = SafeLoader(stream)
+    try:
+        yield from _iter_lines(loader)
+    finally:
+        loader.dispose()
+
+
+def _iter_lines(loader: SafeLoader) -> t.Iterator[ScriptLine]:
+    depth = 0
+    # Anchored scalar events and finished lines, by anchor name.
+    anchors: t.Dict[str, t.Union[yaml.ScalarEvent, ScriptLine, None]] = {}
+    # Depth of a top-level list line being skipped, if any.
+    skip_depth: t.Optional[int] = None
+    # Key and value events of the current line, by key text.
+    mapping: t.Optional[
+        t.Dict[str, t.Tuple[yaml.ScalarEvent, yaml.ScalarEvent]]
+    ] = None
+    mapping_anchor: t.Optional[str] = None
+    key: t.Optional[yaml.ScalarEvent] = None
+    while loader.check_event():
+        event = loader.get_event()
+        if skip_depth is not None:
+            if isinstance(event, yaml.CollectionStartEvent):
+                depth += 1
+            elif isinstance(event, yaml.CollectionEndEvent):
+                depth -= 1
+                if depth < skip_depth:
+                    skip_depth = None
+            continue
+
+        if isinstance(event, yaml.AliasEvent):
+            if event.anchor not in anchors:
+                raise ValueError(
+                    f"Unsupported alias *{event.anchor}{event.start_mark}"
+                )
+            anchored = anchors[event.anchor]
+            if not isinstance(anchored, yaml.ScalarEvent):
+                if depth != 1:
+                    raise ValueError(
+                        f"Alias *{event.anchor} to a line used inside a line"
+                        f"{event.start_mark}"
+                    )
+                if anchored is not None:
+                    if isinstance(anchored, dict):
+                        anchored = dict(anchored)
+                    yield anchored
+                continue
+            event = anchored
+        elif isinstance(event, yaml.ScalarEvent) and event.anchor is not None:
+            anchors[event.anchor] = event
+
+        if isinstance(event, yaml.CollectionStartEvent):
+            depth += 1
+            if depth == 1:
+                if not isinstance(event, yaml.SequenceStartEvent):
+                    raise ValueError(
+                        f"A script must be a sequence of lines{event.start_mark}"
+                    )
+            elif depth == 2 and isinstance(event, yaml.MappingStartEvent):
+                mapping = {}
+                mapping_anchor = event.anchor
+                key = None
+            elif depth == 2:
+                skip_depth = depth
+                if event.anchor is not None:
+                    anchors[event.anchor] = None
+            else:
+                raise ValueError(
+                    f"Unsupported nested collection in a line{event.start_mark}"
+                )
+        elif isinstance(event, yaml.CollectionEndEvent):
+            if depth == 2 and mapping is not None:
+                line = _finish_line(loader, mapping)
+                if mapping_anchor is not None:
+                    anchors[mapping_anchor] = line
+                if line is not None:
+                    yield line
+                mapping = None
+            depth -= 1
+        elif isinstance(event, yaml.ScalarEvent):
+            if depth == 0:
+                raise ValueError(
+                    f"A script must be a sequence of lines{event.start_mark}"
+                )
+            if mapping is None:
+                # A plain string line.
+                continue
+            if key is None:
+                key = event
+            else:
+                mapping[key.value] = (key, event)
+                key = None
+
+
+def _finish_line(
+    loader: SafeLoader,
+    mapping: t.Dict[str, t.Tuple[yaml.ScalarEvent, yaml.ScalarEvent]],
+) -> t.Optional[ScriptLine]:
+    if not mapping:
+        return None
+    if any(key in mapping for key in ITEM_KEYS):
+        return {
+            key: _construct_scalar(loader, value)
+            for key, (_, value) in mapping.items()
+        }
+    if len(mapping) != 1:
+        raise ValueError(
+            f"A voice line must have exactly one character: {list(mapping)}"
+        )
+    ((name, (name_event, message_event)),) = mapping.items()
+    for event in (name_event, message_event):
+        if _resolve_tag(loader, event) == NULL_TAG:
+            raise ValueError(
+                f"Empty character or message in voice line{event.start_mark}"
+            )
+    return name, message_event.value.strip()
+
+
+def _resolve_tag(loader: SafeLoader, event: yaml.ScalarEvent) -> str:
+    tag = event.tag
+    if tag is None or tag == "!":
+        tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+    return tag
+
+
+def _construct_scalar(loader: SafeLoader, event: yaml.ScalarEvent) -> t.Any:
+    """Return the value yaml.safe_load would construct for a scalar event."""
+    node = yaml.ScalarNode(
+        _resolve_tag(loader, event),
+        event.value,
+        event.start_mark,
+        event.end_mark,
+        event.style,
+    )
+    return loader.construct_document(node)
@@ -1,31 +1,37 @@
 from __future__ import annotations
 
 import argparse
-import json
+import functools
+import logging
+import os
+import sys
 import typing as t
+from collections import defaultdict, deque
 from pathlib import Path
 
-import yaml
-from PIL import Image
-from pydantic import BaseModel, Field, validator
+import imagesize
+import orjson
+from pydantic import BaseModel
 
-from .project import ImageItem, ItemType, Project, TextItem, VoiceItem
+from .project import (
+    ImageItem,
+    ItemType,
+    ProjectRaw,
+    TextItem,
+    VideoInfo,
+    VoiceItem,
+)
+from .script import ScriptLine, iter_script
 
+logger = logging.getLogger(__name__)
 
-class VoiceSpec(BaseModel):
-    character: str
-    text: str
+UTF8_BOM = b"\xef\xbb\xbf"
+# Raw timeline items carry the discriminator as a plain str.
+VOICE_TYPE = ItemType.Voice.value
 
-    @validator("text")
-    def validate_text(cls, value: str) -> str:
-        return value.strip()
 
-    def matches(self, other: VoiceItem) -> bool:
-        if self.character != other.CharacterName:
-            return False
-        if self.text != other.Serif:
-            return False
-        return True
+# A script VoiceLine; matches a VoiceItem's (CharacterName, Serif).
+VoiceSpec = t.Tuple[str, str]
 
 
 class ItemSpec(BaseModel):
@@ -45,65 +51,126 @@ class TextSpec(ItemSpec):
 
 
 def main(yaml_path: Path, ymmp_path: Path, output_path: Path):
-    lines = yaml.safe_load(yaml_path.read_text())
-    item_specs = list(list_item_specs(lines))
-    project = Project.parse_obj(json.loads(ymmp_path.read_text(encoding="utf-8-sig")))
+    with yaml_path.open("rb") as f:
+        item_specs = list(list_item_specs(iter_script(f)))
+    data = ymmp_path.read_bytes()
+    if data.startswith(UTF8_BOM):
+        data = data[len(UTF8_BOM) :]
+    project = ProjectRaw.parse_raw(data)
     project_root = Path(os.environ.get("PROJECT_ROOT", output_path.parent))
     layer = 3
+    # Parallel lists: the match key of each voice item and its raw dict.
+    # Only matched items are validated into VoiceItem.
+    voice_keys: t.List[VoiceSpec] = []
+    voice_items: t.List[t.Dict[str, t.Any]] = []
     for item in project.Timeline.Items:
-        if item.Layer >= layer:
-            item.Layer += 1
-    voice_items = [
-        item for item in project.Timeline.Items if item.Type == ItemType.Voice
-    ]
-    while len(item_specs) and len(voice_items):
-        current_item_spec = item_specs.pop(0)
-        while voice_items and not current_item_spec.start_voice_spec.matches(
-            voice_items[0]
-        ):
-            voice_items.pop(0)
-        if not voice_items:
+        if item.get("Layer", 0) >= layer:
+            item["Layer"] += 1
+        if item["$type"] == VOICE_TYPE:
+            voice_keys.append(
+                (sys.intern(item["CharacterName"]), sys.intern(item["Serif"]))
+            )
+            voice_items.append(item)
+    voice_index = index_voice_keys(voice_keys)
+    cursor = 0
+    for current_item_spec in item_specs:
+        if cursor >= len(voice_items):
+            break
+        start = find_voice_item(voice_index, current_item_spec.start_voice_spec, cursor)
+        if start is None:
             raise ValueError(
                 f"No matching voice item for {current_item_spec.start_voice_spec}"
             )
-        start_voice_item = voice_items[0]
-        while voice_items and not current_item_spec.end_voice_spec.matches(
-            voice_items[0]
-        ):
-            voice_items.pop(0)
-        if not voice_items:
+        end = find_voice_item(voice_index, current_item_spec.end_voice_spec, start)
+        if end is None:
             raise ValueError(
                 f"No matching voice item for {current_item_spec.end_voice_spec}"
             )
-        end_voice_item = voice_items.pop(0)
-        if isinstance(current_item_spec, ImageSpec):
-            transform = calculate_image_transformation(
-                Path(current_item_spec.image), project.Timeline.VideoInfo, 320, 20
-            )
-            if current_item_spec.zoom is None:
-                current_item_spec.zoom = transform.zoom
-            if current_item_spec.y is None:
-                current_item_spec.y = transform.y
-            new_item = ImageItem.from_spec(
-                project_root, current_item_spec, layer, start_voice_item, end_voice_item
-            )
-        elif isinstance(current_item_spec, TextSpec):
-            new_item = TextItem.from_spec(
-                current_item_spec, layer, start_voice_item, end_voice_item
+        start_voice_item = VoiceItem.parse_obj(voice_items[start])
+        end_voice_item = VoiceItem.parse_obj(voice_items[end])
+        cursor = end + 1
+        item_from_spec = ITEM_FACTORIES[type(current_item_spec)]
+        new_item = item_from_spec(
+            current_item_spec,
+            project_root,
+            project.Timeline.VideoInfo,
+            layer,
+            start_voice_item,
+            end_voice_item,
+        )
+        project.Timeline.Items.append(new_item.dict(by_alias=True))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for item in project.Timeline.Items:
+            logger.debug(
+                "%s %s %s %s",
+                item["$type"],
+                item["Frame"],
+                item.get("CharacterName", "n/a"),
+                item.get("FilePath", "n/a"),
             )
-        if new_item:
-            project.Timeline.Items.append(new_item.dict(by_alias=True))
 
-    for item in project.Timeline.Items:
-        print(
-            getattr(item, "Type") if hasattr(item, "Type") else item["$type"],
-            getattr(item, "Frame") if hasattr(item, "Frame") else item["Frame"],
-            getattr(item, "CharacterName", "n/a"),
-            getattr(item, "FilePath", "n/a"),
-        )
+    data = orjson.dumps(
+        project.dict(by_alias=True),
+        option=orjson.OPT_INDENT_2
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_APPEND_NEWLINE,
+    )
+    # Write the BOM separately rather than concatenating, which would copy
+    # the whole serialized project once more.
+    with output_path.open("wb") as f:
+        f.write(UTF8_BOM)
+        f.write(data)
+
+
+def image_item_from_spec(
+    spec: ImageSpec,
+    project_root: Path,
+    video_info: VideoInfo,
+    layer: int,
+    start_item: VoiceItem,
+    end_item: VoiceItem,
+) -> ImageItem:
+    transform = calculate_image_transformation(Path(spec.image), video_info, 320, 20)
+    if spec.zoom is None:
+        spec.zoom = transform.zoom
+    if spec.y is None:
+        spec.y = transform.y
+    return ImageItem.from_spec(project_root, spec, layer, start_item, end_item)
+
 
-    with output_path.open("w", encoding="utf-8-sig") as f:
-        json.dump(project.dict(by_alias=True), f, indent=2, ensure_ascii=False)
+def text_item_from_spec(
+    spec: TextSpec,
+    project_root: Path,
+    video_info: VideoInfo,
+    layer: int,
+    start_item: VoiceItem,
+    end_item: VoiceItem,
+) -> TextItem:
+    return TextItem.from_spec(spec, layer, start_item, end_item)
+
+
+ITEM_FACTORIES = {
+    ImageSpec: image_item_from_spec,
+    TextSpec: text_item_from_spec,
+}
+
+
+def index_voice_keys(voice_keys: t.List[VoiceSpec]) -> t.Dict[VoiceSpec, t.Deque[int]]:
+    index: t.Dict[VoiceSpec, t.Deque[int]] = defaultdict(deque)
+    for i, key in enumerate(voice_keys):
+        index[key].append(i)
+    return index
+
+
+def find_voice_item(
+    index: t.Dict[VoiceSpec, t.Deque[int]], spec: VoiceSpec, cursor: int
+) -> t.Optional[int]:
+    """Return the position of the first voice item at or after cursor matching spec."""
+    positions = index.get(spec)
+    while positions and positions[0] < cursor:
+        positions.popleft()
+    return positions[0] if positions else None
 
 
 class ImageTransformation(BaseModel):
@@ -111,11 +178,26 @@ class ImageTransformation(BaseModel):
     y: int = 0
 
 
+@functools.lru_cache(maxsize=None)
+def read_image_size(image_path: str) -> t.Tuple[int, int]:
+    """Return (width, height) of the image, read from its header only.
+
+    Requires imagesize>=2 for exif_rotation; sizes are reported as stored,
+    matching PIL's Image.size.
+    """
+    # imagesize maps every error to (-1, -1), so open the file here to let
+    # missing or unreadable files raise as usual.
+    with open(image_path, "rb") as f:
+        width, height = imagesize.get(f, exif_rotation=False)
+    if width < 0 or height < 0:
+        raise ValueError(f"Could not read image size of {image_path}")
+    return width, height
+
+
 def calculate_image_transformation(
     image_path: Path, video_info: VideoInfo, bottom_margin: int, margin: int
 ) -> ImageTransformation:
-    image = Image.open(image_path.resolve())
-    image_width, image_height = image.size
+    image_width, image_height = read_image_size(str(image_path.resolve()))
 
     transform = ImageTransformation()
 
@@ -130,11 +212,11 @@ def calculate_image_transformation(
     return transform
 
 
-def list_item_specs(lines: t.List[dict]):
+def list_item_specs(lines: t.Iterable[ScriptLine]):
     current_item = None
     last_voice_spec = None
     for line in lines:
-        if "image" in line or "text" in line:
+        if isinstance(line, dict):
             if current_item:
                 if last_voice_spec:
                     current_item.end_voice_spec = last_voice_spec
@@ -152,10 +234,8 @@ def list_item_specs(lines: t.List[dict]):
             continue
         if not current_item:
             continue
-        if not line or not isinstance(line, dict):
-            continue
-        key, value = list(line.items())[0]
-        voice_spec = VoiceSpec(character=key, text=value)
+        name, message = line
+        voice_spec = (sys.intern(name), sys.intern(message))
         if not current_item.start_voice_spec:
             current_item.start_voice_spec = voice_spec
             continue
@@ -173,5 +253,7 @@ if __name__ == "__main__":
     parser.add_argument("source_yaml", type=Path)
     parser.add_argument("draft_ymmp", type=Path)
     parser.add_argument("output_path", type=Path)
+    parser.add_argument("-v", "--verbose", action="store_true")
     args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
     main(args.source_yaml, args.draft_ymmp, args.output_path)
@@ -1,24 +1,15 @@
 import csv
 import sys
-import typing as t
 
-import yaml
+from .script import iter_script
 
 
 def main(input_path: str):
-    with open(input_path, "r") as f:
-        lines = yaml.safe_load(f)
-
     writer = csv.writer(sys.stdout)
-    for line in lines:
-        if isinstance(line, str):
-            continue
-        if isinstance(line, dict):
-            if "image" in line or "text" in line:
-                continue
-            assert len(line) == 1
-            name, message = list(line.items())[0]
-            writer.writerow([name, message.strip()])
+    with open(input_path, "rb") as f:
+        for line in iter_script(f):
+            if isinstance(line, tuple):
+                writer.writerow(line)
 
 
 if __name__ == "__main__":